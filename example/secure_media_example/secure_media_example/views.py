@@ -1,6 +1,8 @@
-from django.core.files.storage import default_storage
-from django.http import HttpResponseRedirect
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core import signing
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.http import Http404, HttpResponseRedirect
 from django.utils.safestring import SafeString
 from django.urls import reverse, reverse_lazy
 from django.views.generic import View, TemplateView, FormView
@@ -8,6 +10,40 @@ from django.views.generic import View, TemplateView, FormView
 from .forms import FileUploadForm
 
 
+DELETE_SALT = "secure-media-delete"
+
+# Concurrent `listdir()` calls used to walk remote (non-filesystem) storages.
+LISTDIR_WORKERS = 16
+
+
+def _walk_storage(storage, top):
+    """
+    Return the `(directories, files)` listing of every folder under `top`.
+    """
+    listing = {}
+    if isinstance(storage, FileSystemStorage):
+        # Local listings are cheap; a thread pool would only add overhead.
+        pending = [top]
+        while pending:
+            path = pending.pop()
+            dirs, files = storage.listdir(path)
+            listing[path] = (dirs, files)
+            pending.extend(f"{path}/{d}" for d in dirs)
+    else:
+        # Each `listdir()` is a round-trip for remote storages, so list folders concurrently.
+        with ThreadPoolExecutor(max_workers=LISTDIR_WORKERS) as executor:
+            pending = {executor.submit(storage.listdir, top): top}
+            while pending:
+                for future in as_completed(list(pending)):
+                    path = pending.pop(future)
+                    dirs, files = future.result()
+                    listing[path] = (dirs, files)
+                    for d in dirs:
+                        sub_path = f"{path}/{d}"
+                        pending[executor.submit(storage.listdir, sub_path)] = sub_path
+    return listing
+
+
 class CatalogView(TemplateView):
     """
     Catalog storage.
@@ -17,31 +53,43 @@ class CatalogView(TemplateView):
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
 
-        def _parse_storage(path):
-            catalog = "<ul><li class='folder-symb'>{0}</li>{1}</ul>"
-            curr_dirs, files = default_storage.listdir(path)
-
-            # Files
-            _contents = []
-            for f in files:
-                f_path = "/".join([path, f])
-                _contents.append(
-                    "<li>{0}&nbsp;{1}</li>".format(
-                        "<a href=\"{0}\">{1}</a>".format(default_storage.url(f_path), f), 
-                        (
-                            "<a href=\"{0}\" class='badge rounded-pill bg-danger' title='Delete'><i class='bi bi-trash'></i></a>"
-                        ).format(
-                            reverse("file_delete", kwargs={"path_code": urlsafe_base64_encode(f_path.encode())})
-                        ) if self.request.user.is_authenticated else ""
-                    )
-                )
-            contents = "<ul>{0}</ul>".format("".join(_contents))
-
-            # Get contents of sub-folders
-            if curr_dirs:
-                for _dir in curr_dirs:
-                    contents += _parse_storage("/".join([path, _dir]))
-            return catalog.format(path, contents)
+        def _parse_storage(top):
+            show_delete = self.request.user.is_authenticated
+            if show_delete:
+                # Reverse once; only the encoded path differs between files.
+                delete_url = reverse("file_delete", kwargs={"path_code": "__path_code__"})
+                # Same tokens as `signing.dumps()`, without building a signer per file.
+                signer = signing.TimestampSigner(salt=DELETE_SALT)
+
+            listing = _walk_storage(default_storage, top)
+            parts = []
+            stack = [top]
+            while stack:
+                path = stack.pop()
+                if path is None:
+                    parts.append("</ul>")
+                    continue
+
+                curr_dirs, files = listing[path]
+                parts.append("<ul><li class='folder-symb'>{0}</li><ul>".format(path))
+
+                # Files
+                for f in files:
+                    f_path = f"{path}/{f}"
+                    parts.append("<li><a href=\"{0}\">{1}</a>&nbsp;".format(default_storage.url(f_path), f))
+                    if show_delete:
+                        parts.append(
+                            "<a href=\"{0}\" class='badge rounded-pill bg-danger' title='Delete'><i class='bi bi-trash'></i></a>".format(
+                                delete_url.replace("__path_code__", signer.sign_object(f_path))
+                            )
+                        )
+                    parts.append("</li>")
+                parts.append("</ul>")
+
+                # Sub-folders are closed after all of their contents
+                stack.append(None)
+                stack.extend(f"{path}/{_dir}" for _dir in reversed(curr_dirs))
+            return "".join(parts)
 
         try:
             context["catalog"] = SafeString(_parse_storage("."))
@@ -71,6 +119,9 @@ class DeleteFileView(View):
     """
     def get(self, request, *args, **kwargs):
         path_code = kwargs.get("path_code", "")
-        path = urlsafe_base64_decode(path_code).decode()
+        try:
+            path = signing.loads(path_code, salt=DELETE_SALT)
+        except signing.BadSignature:
+            raise Http404("Invalid file")
         default_storage.delete(path)
         return HttpResponseRedirect(reverse("catalog"))
@@ -1,7 +1,5 @@
 from typing import Optional
 
-from django.utils.module_loading import autodiscover_modules
-
 from .decorators import secure_media_path
 from .policies import MediaAccessPolicy, MediaAccessPolicyRegistry
 
@@ -34,4 +32,6 @@ def register(media_policy: 'MediaAccessPolicy', policy_registry: Optional['Media
 
 
 def autodiscover():
-    autodiscover_modules('media_policies')
+    from django_secure_media.policies import registry as default_registry
+
+    default_registry.discover()
@@ -1,4 +1,5 @@
 from django.apps import AppConfig
+from django.conf import settings
 
 
 class DjangoSecureMediaConfig(AppConfig):
@@ -8,4 +9,6 @@ class DjangoSecureMediaConfig(AppConfig):
 
     def ready(self):
         super().ready()
-        self.module.autodiscover()
+        # With `SECURE_MEDIA_LAZY_DISCOVER`, policies are discovered on the first access check instead.
+        if not getattr(settings, "SECURE_MEDIA_LAZY_DISCOVER", False):
+            self.module.autodiscover()
@@ -7,6 +7,22 @@ if TYPE_CHECKING:
     from .policies import MediaAccessPolicyRegistry
 
 
+RESTRICTED_MESSAGE = "Restricted media file"
+
+
+def _resolve_is_allowed(policy_registry: Optional['MediaAccessPolicyRegistry'] = None) -> Optional[Callable]:
+    """
+    Return the bound `is_allowed` method of the registry to check paths against.
+
+    Return `None` if the default registry has not been set up or its policies discovered yet.
+    """
+    from django_secure_media.policies import registry as default_registry
+
+    if policy_registry is not None:
+        return policy_registry.is_allowed
+    return default_registry.bound_is_allowed()
+
+
 def secure_media_path(function: Optional[Callable] = None, policy_registry: Optional['MediaAccessPolicyRegistry'] = None):
     """
     Decorator that wraps a view to enforce multiple media access policies.
@@ -14,11 +30,19 @@ def secure_media_path(function: Optional[Callable] = None, policy_registry: Opti
     from django_secure_media.policies import registry as default_registry
 
     def decorator(view_func):
+        is_allowed = _resolve_is_allowed(policy_registry)
+
         def check_path(request, path, *args, **kwargs):
-            registry = policy_registry or default_registry
+            nonlocal is_allowed
+            if is_allowed is None:
+                # The default registry was not ready when the view was decorated.
+                allowed = default_registry.is_allowed(request, path)
+                is_allowed = _resolve_is_allowed()
+            else:
+                allowed = is_allowed(request, path)
 
-            if not registry.is_allowed(request, path):
-                raise Http404("Restricted media file")
+            if not allowed:
+                raise Http404(RESTRICTED_MESSAGE)
             return view_func(request, path, *args, **kwargs)
         return wraps(view_func)(check_path)
 
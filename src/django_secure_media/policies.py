@@ -1,9 +1,10 @@
 import os
+import threading
 from typing import Callable, Iterable
 
 from django.apps import apps
-from django.utils.functional import LazyObject
-from django.utils.module_loading import import_string
+from django.utils.functional import LazyObject, empty
+from django.utils.module_loading import autodiscover_modules, import_string
 from django.utils.translation import gettext as _
 
 
@@ -11,9 +12,15 @@ class MediaAccessPolicy:
     """
     Defines a rule for restricting access to certain media path prefixes.
     """
+    __slots__ = ("restricted_prefixes", "access_check", "_prefixes_bytes")
+
     def __init__(self, restricted_prefixes: tuple[str, ...], access_check: Callable):
-        self.restricted_prefixes = restricted_prefixes
+        if isinstance(restricted_prefixes, str):
+            # A single prefix, e.g. `('images/')` without the trailing comma.
+            restricted_prefixes = (restricted_prefixes,)
+        self.restricted_prefixes = tuple(restricted_prefixes)
         self.access_check = access_check
+        self._prefixes_bytes = tuple(p.encode() for p in self.restricted_prefixes)
 
     def __repr__(self):
         return f"{self.__class__.__name__}(restricted_prefixes={self.restricted_prefixes!r}, access_check={self.access_check!r})"
@@ -24,10 +31,8 @@ class MediaAccessPolicy:
         """
         tmp_path = os.fspath(path)
         if isinstance(tmp_path, bytes):
-            prefixes = tuple(p.encode() for p in self.restricted_prefixes)
-        else:
-            prefixes = self.restricted_prefixes
-        return tmp_path.startswith(prefixes)
+            return tmp_path.startswith(self._prefixes_bytes)
+        return tmp_path.startswith(self.restricted_prefixes)
 
     def is_allowed(self, request, path: str | bytes) -> bool:
         """
@@ -36,6 +41,77 @@ class MediaAccessPolicy:
         return self.access_check(request, path)
 
 
+class _PrefixTrieNode:
+    __slots__ = ("edges", "value")
+
+    def __init__(self):
+        self.edges = {}
+        self.value = None
+
+
+class _PrefixTrie:
+    """
+    Compressed (PATRICIA) trie mapping string prefixes to values.
+
+    Insertion order wins: a key that is already covered by a previously
+    inserted prefix resolves to that prefix's value, so `longest_match`
+    returns the value of the first inserted prefix of the looked-up key.
+    """
+    __slots__ = ("root",)
+
+    def __init__(self):
+        self.root = _PrefixTrieNode()
+
+    def insert(self, key: str, value):
+        node = self.root
+        inherited = node.value
+        while key:
+            edge = node.edges.get(key[0])
+            if edge is None:
+                child = _PrefixTrieNode()
+                node.edges[key[0]] = (key, child)
+                node = child
+                break
+
+            label, child = edge
+            common = 1
+            limit = min(len(label), len(key))
+            while common < limit and label[common] == key[common]:
+                common += 1
+            if common < len(label):
+                # Split the edge so that the common part ends on its own node.
+                middle = _PrefixTrieNode()
+                middle.edges[label[common]] = (label[common:], child)
+                node.edges[key[0]] = (label[:common], middle)
+                child = middle
+
+            node = child
+            key = key[common:]
+            if node.value is not None:
+                inherited = node.value
+
+        if node.value is None:
+            node.value = value if inherited is None else inherited
+
+    def longest_match(self, key: str):
+        node = self.root
+        match = node.value
+        edges = node.edges
+        index, length = 0, len(key)
+        while edges and index < length:
+            edge = edges.get(key[index])
+            if edge is None:
+                break
+            label, node = edge
+            if not key.startswith(label, index):
+                break
+            if node.value is not None:
+                match = node.value
+            index += len(label)
+            edges = node.edges
+        return match
+
+
 class MediaAccessPolicyRegistry:
     """
     Manages multiple media access policies and selects one based on path.
@@ -43,6 +119,9 @@ class MediaAccessPolicyRegistry:
     def __init__(self, policies: Iterable[MediaAccessPolicy] = (), default_allow=True):
         self.policies = list(policies)
         self.default_allow = default_allow
+        # Serialises registration with building the lookup state, so a new policy is never lost.
+        self._lock = threading.Lock()
+        self._reset_lookup()
 
     def __repr__(self):
         return f"{self.__class__.__name__}(policies={self.policies!r}, default_allow={self.default_allow!r})"
@@ -51,32 +130,161 @@ class MediaAccessPolicyRegistry:
         """
         Register an additional policy.
         """
-        self.policies.append(policy)
+        with self._lock:
+            self.policies.append(policy)
+            self._reset_lookup()
+
+    def _reset_lookup(self):
+        """
+        Reset the lookup state derived from the registered policies.
+        """
+        self._empty = not self.policies
+        self._lookup = None
+
+    def _get_lookup(self) -> tuple[_PrefixTrie, tuple, frozenset | None, frozenset | None]:
+        """
+        Return the prefix trie of the registered policies and the policies that
+        customise `matches`, building them if needed.
+
+        Both hold `(order, policy, check)` entries, where `order` is the policy's
+        position in the registry. They come with the first characters and first
+        bytes of the trie's prefixes, or `None` when a path can match without
+        starting with one of them.
+        """
+        lookup = self._lookup
+        if lookup is None:
+            with self._lock:
+                lookup = self._lookup
+                if lookup is None:
+                    trie, custom, first_bytes = _PrefixTrie(), [], set()
+                    for order, policy in enumerate(self.policies):
+                        # Call `access_check` directly unless a subclass customises `is_allowed`.
+                        if type(policy).is_allowed is MediaAccessPolicy.is_allowed:
+                            check = policy.access_check
+                        else:
+                            check = policy.is_allowed
+                        if type(policy).matches is not MediaAccessPolicy.matches:
+                            # Custom matching can't be indexed by prefix; these are checked in order.
+                            custom.append((order, policy, check))
+                        else:
+                            for prefix in policy.restricted_prefixes:
+                                trie.insert(prefix, (order, policy, check))
+                                first_bytes.add(prefix.encode()[:1])
+                    if custom or trie.root.value is not None:
+                        lookup = (trie, tuple(custom), None, None)
+                    else:
+                        lookup = (trie, (), frozenset(trie.root.edges), frozenset(first_bytes))
+                    self._lookup = lookup
+        return lookup
+
+    @staticmethod
+    def _first_custom_match(custom: tuple, path: str | bytes, match: tuple | None) -> tuple | None:
+        """
+        Return the entry of the first policy with custom matching that matches the path
+        and was registered before `match`, or `match` itself.
+        """
+        for entry in custom:
+            if match is not None and entry[0] > match[0]:
+                break
+            if entry[1].matches(path):
+                return entry
+        return match
+
+    def _match(self, path: str | bytes) -> tuple[int, MediaAccessPolicy, Callable] | None:
+        """
+        Return the first matching policy for a path along with its access check.
+        """
+        trie, custom, _, _ = self._get_lookup()
+        tmp_path = os.fspath(path)
+        if isinstance(tmp_path, bytes):
+            tmp_path = tmp_path.decode(errors="surrogateescape")
+        match = trie.longest_match(tmp_path)
+        if custom:
+            match = self._first_custom_match(custom, path, match)
+        return match
 
     def get_policy_for_path(self, path: str | bytes) -> MediaAccessPolicy | None:
         """
         Return the first matching policy for a path.
         """
-        for policy in self.policies:
-            if policy.matches(path):
-                return policy
-        return None
+        match = self._match(path)
+        if match is None:
+            return None
+        return match[1]
 
     def is_allowed(self, request, path: str | bytes) -> bool:
         """
         Return whether the given request is allowed to access the path.
         """
-        policy = self.get_policy_for_path(path)
-        if policy:
-            return policy.is_allowed(request, path)
-        return self.default_allow
+        if self._empty:
+            return self.default_allow
+        # Same as `_match()`, inlined: this runs for every served file.
+        lookup = self._lookup
+        if lookup is None:
+            lookup = self._get_lookup()
+        trie, custom, first_chars, first_bytes = lookup
+        # Paths that can't start any restricted prefix skip the trie.
+        if type(path) is str:
+            if first_chars is not None and path[:1] not in first_chars:
+                return self.default_allow
+            tmp_path = path
+        else:
+            tmp_path = os.fspath(path)
+            if isinstance(tmp_path, bytes):
+                if first_bytes is not None and tmp_path[:1] not in first_bytes:
+                    return self.default_allow
+                tmp_path = tmp_path.decode(errors="surrogateescape")
+            elif first_chars is not None and tmp_path[:1] not in first_chars:
+                return self.default_allow
+        match = trie.longest_match(tmp_path)
+        if custom:
+            match = self._first_custom_match(custom, path, match)
+        if match is None:
+            return self.default_allow
+        return match[2](request, path)
 
 
 class DefaultMediaAccessPolicyRegistry(LazyObject):
+    _discovered = False
+    _discover_lock = threading.RLock()
+
     def _setup(self):
         MediaAccessPolicyRegistryClass = import_string(apps.get_app_config("django_secure_media").default_registry)
         self._wrapped = MediaAccessPolicyRegistryClass()
 
+    def discover(self):
+        """
+        Import the `media_policies` module of every installed app, once.
+        """
+        if self._discovered:
+            return
+        with self._discover_lock:
+            if not self._discovered:
+                autodiscover_modules('media_policies')
+                # Set on the proxy itself; LazyObject forwards attribute writes to the wrapped registry.
+                self.__dict__["_discovered"] = True
+
+    def is_allowed(self, request, path: str | bytes) -> bool:
+        """
+        Return whether the given request is allowed to access the path.
+
+        Policies are discovered first if that has not happened yet (`SECURE_MEDIA_LAZY_DISCOVER`).
+        """
+        if not self._discovered:
+            self.discover()
+        if self._wrapped is empty:
+            self._setup()
+        return self._wrapped.is_allowed(request, path)
+
+    def bound_is_allowed(self) -> Callable | None:
+        """
+        Return the wrapped registry's bound `is_allowed` method, or `None` if the
+        registry has not been set up or its policies discovered yet.
+        """
+        if self._wrapped is empty or not self._discovered:
+            return None
+        return self._wrapped.is_allowed
+
     def __repr__(self):
         return repr(self._wrapped)
 
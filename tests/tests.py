@@ -1,8 +1,14 @@
-from django.test import RequestFactory, TestCase
+import threading
+from unittest import mock
+
+from django.apps import apps
+from django.test import RequestFactory, TestCase, override_settings
 from django.http import HttpResponse
 
 from django_secure_media.decorators import secure_media_path
-from django_secure_media.policies import MediaAccessPolicy, MediaAccessPolicyRegistry
+from django_secure_media.policies import (
+    DefaultMediaAccessPolicyRegistry, MediaAccessPolicy, MediaAccessPolicyRegistry, _PrefixTrie,
+)
 
 
 class SecureMediaTests(TestCase):
@@ -23,3 +29,192 @@ class SecureMediaTests(TestCase):
         req.user = type("User", (), {"is_authenticated": False})()
         with self.assertRaisesMessage(Exception, "Restricted media file"):
             self.view(req, 'images/a.jpg')
+
+
+class SecureMediaDefaultRegistryTests(TestCase):
+    def setUp(self):
+        self.registry = DefaultMediaAccessPolicyRegistry()
+        patcher = mock.patch("django_secure_media.policies.registry", self.registry)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.user = type("User", (), {"is_authenticated": False})()
+
+    def discover(self, module_name):
+        self.registry.register(MediaAccessPolicy(('images/',), lambda r, p: r.user.is_authenticated))
+
+    def get(self, view, path):
+        req = RequestFactory().get(f'/media/{path}')
+        req.user = self.user
+        return view(req, path)
+
+    def test_registry_resolved_on_first_request(self):
+        view = secure_media_path(lambda r, p: HttpResponse("OK"))
+        with mock.patch("django_secure_media.policies.autodiscover_modules", side_effect=self.discover):
+            with self.assertRaisesMessage(Exception, "Restricted media file"):
+                self.get(view, 'images/a.jpg')
+
+        # Later requests use the bound method of the underlying registry.
+        with mock.patch.object(DefaultMediaAccessPolicyRegistry, "is_allowed") as proxy_is_allowed:
+            with self.assertRaisesMessage(Exception, "Restricted media file"):
+                self.get(view, 'images/a.jpg')
+            self.assertEqual(self.get(view, 'public/a.jpg').status_code, 200)
+        proxy_is_allowed.assert_not_called()
+
+    def test_registry_resolved_at_decoration(self):
+        with mock.patch("django_secure_media.policies.autodiscover_modules", side_effect=self.discover):
+            self.registry.discover()
+        view = secure_media_path(lambda r, p: HttpResponse("OK"))
+        with mock.patch.object(DefaultMediaAccessPolicyRegistry, "is_allowed") as proxy_is_allowed:
+            with self.assertRaisesMessage(Exception, "Restricted media file"):
+                self.get(view, 'images/a.jpg')
+        proxy_is_allowed.assert_not_called()
+
+
+class MediaAccessPolicyTests(TestCase):
+    def test_matches(self):
+        policy = MediaAccessPolicy(('images/', 'a.b'), lambda r, p: True)
+        self.assertTrue(policy.matches('images/a.jpg'))
+        self.assertTrue(policy.matches(b'a.b/c.jpg'))
+        self.assertFalse(policy.matches('axb/c.jpg'))
+        self.assertFalse(policy.matches(b'public/images/a.jpg'))
+        self.assertFalse(MediaAccessPolicy((), lambda r, p: True).matches('images/a.jpg'))
+
+    def test_single_prefix_string(self):
+        policy = MediaAccessPolicy('images/', lambda r, p: True)
+        self.assertEqual(policy.restricted_prefixes, ('images/',))
+        self.assertTrue(policy.matches('images/a.jpg'))
+        self.assertFalse(policy.matches('audio.mp3'))
+        registry = MediaAccessPolicyRegistry([policy])
+        self.assertIsNone(registry.get_policy_for_path('audio.mp3'))
+        self.assertIs(registry.get_policy_for_path('images/a.jpg'), policy)
+
+
+class MediaAccessPolicyRegistryTests(TestCase):
+    def test_first_registered_policy_wins(self):
+        images = MediaAccessPolicy(('images/',), lambda r, p: True)
+        private = MediaAccessPolicy(('images/private/', 'img'), lambda r, p: False)
+        registry = MediaAccessPolicyRegistry([images, private])
+        self.assertIs(registry.get_policy_for_path('images/private/a.jpg'), images)
+        self.assertIs(registry.get_policy_for_path('img/a.jpg'), private)
+        self.assertIsNone(registry.get_policy_for_path('im'))
+
+        registry = MediaAccessPolicyRegistry([private, images])
+        self.assertIs(registry.get_policy_for_path('images/private/a.jpg'), private)
+        self.assertIs(registry.get_policy_for_path('images/a.jpg'), images)
+        self.assertIs(registry.get_policy_for_path('img/images/a.jpg'), private)
+
+    def test_register_rebuilds_lookup(self):
+        registry = MediaAccessPolicyRegistry()
+        self.assertIsNone(registry.get_policy_for_path('profiles/a.jpg'))
+        policy = MediaAccessPolicy(('profiles/',), lambda r, p: True)
+        registry.register(policy)
+        self.assertIs(registry.get_policy_for_path('profiles/a.jpg'), policy)
+        self.assertIs(registry.get_policy_for_path(b'profiles/a.jpg'), policy)
+        self.assertIsNone(registry.get_policy_for_path(b'public/a.jpg'))
+
+    def test_is_allowed_uses_overridden_policy_check(self):
+        class DenyPolicy(MediaAccessPolicy):
+            def is_allowed(self, request, path):
+                return False
+
+        registry = MediaAccessPolicyRegistry([DenyPolicy(('docs/',), lambda r, p: True)])
+        self.assertFalse(registry.is_allowed(None, 'docs/a.pdf'))
+        self.assertTrue(registry.is_allowed(None, 'public/a.pdf'))
+
+    def test_overridden_matches_is_used(self):
+        class PrivatePolicy(MediaAccessPolicy):
+            def matches(self, path):
+                return super().matches(path) or str(path).endswith('.private')
+
+        images = MediaAccessPolicy(('images/',), lambda r, p: True)
+        private = PrivatePolicy(('secret/',), lambda r, p: False)
+        registry = MediaAccessPolicyRegistry([images, private])
+        self.assertFalse(registry.is_allowed(None, 'uploads/report.private'))
+        self.assertFalse(registry.is_allowed(None, 'secret/a.jpg'))
+        self.assertTrue(registry.is_allowed(None, 'images/report.private'))
+        self.assertTrue(registry.is_allowed(None, 'uploads/a.jpg'))
+
+        registry = MediaAccessPolicyRegistry([private, images])
+        self.assertIs(registry.get_policy_for_path('images/report.private'), private)
+
+    def test_is_allowed_skips_trie_for_unrestricted_paths(self):
+        images = MediaAccessPolicy(('images/', 'ñ/'), lambda r, p: False)
+        registry = MediaAccessPolicyRegistry([images], default_allow=True)
+        with mock.patch.object(_PrefixTrie, "longest_match", wraps=registry._get_lookup()[0].longest_match) as longest_match:
+            self.assertTrue(registry.is_allowed(None, 'public/a.jpg'))
+            self.assertTrue(registry.is_allowed(None, b'public/a.jpg'))
+            self.assertTrue(registry.is_allowed(None, ''))
+            longest_match.assert_not_called()
+            self.assertFalse(registry.is_allowed(None, 'images/a.jpg'))
+            self.assertFalse(registry.is_allowed(None, 'ñ/a.jpg'.encode()))
+            self.assertTrue(registry.is_allowed(None, 'ima.jpg'))
+            self.assertEqual(longest_match.call_count, 3)
+
+        # A policy that may match any path disables the shortcut.
+        registry.register(MediaAccessPolicy(('',), lambda r, p: False))
+        self.assertFalse(registry.is_allowed(None, 'images/a.jpg'))
+        self.assertFalse(MediaAccessPolicyRegistry([images, registry.policies[-1]]).is_allowed(None, 'public/a.jpg'))
+
+    def test_instance_methods_can_be_patched(self):
+        registry = MediaAccessPolicyRegistry([MediaAccessPolicy(('images/',), lambda r, p: True)])
+        with mock.patch.object(registry, "is_allowed", return_value=False):
+            self.assertFalse(registry.is_allowed(None, 'images/a.jpg'))
+        self.assertTrue(registry.is_allowed(None, 'images/a.jpg'))
+
+    def test_register_waits_for_lookup_build(self):
+        register_called = threading.Event()
+
+        class SignallingRegistry(MediaAccessPolicyRegistry):
+            def register(self, policy):
+                register_called.set()
+                super().register(policy)
+
+        images = MediaAccessPolicy(('images/',), lambda r, p: True)
+        docs = MediaAccessPolicy(('docs/',), lambda r, p: False)
+        registry = SignallingRegistry([images])
+        thread = threading.Thread(target=registry.register, args=(docs,))
+        insert = _PrefixTrie.insert
+
+        def insert_while_registering(trie, key, value):
+            if thread.ident is None:
+                thread.start()
+                self.assertTrue(register_called.wait(timeout=5))
+                # The registration waits until the lookup state has been published.
+                self.assertNotIn(docs, registry.policies)
+            insert(trie, key, value)
+
+        with mock.patch.object(_PrefixTrie, "insert", insert_while_registering):
+            self.assertIs(registry.get_policy_for_path('images/a.jpg'), images)
+        thread.join()
+        self.assertIs(registry.get_policy_for_path('docs/a.pdf'), docs)
+
+
+class DefaultMediaAccessPolicyRegistryTests(TestCase):
+    def test_discovers_policies_on_first_check(self):
+        registry = DefaultMediaAccessPolicyRegistry()
+        with mock.patch("django_secure_media.policies.autodiscover_modules") as autodiscover_modules:
+            self.assertTrue(registry.is_allowed(None, 'images/a.jpg'))
+            self.assertTrue(registry.is_allowed(None, 'images/a.jpg'))
+        autodiscover_modules.assert_called_once_with('media_policies')
+
+    def test_bound_is_allowed(self):
+        registry = DefaultMediaAccessPolicyRegistry()
+        self.assertIsNone(registry.bound_is_allowed())
+        with mock.patch("django_secure_media.policies.autodiscover_modules"):
+            registry.discover()
+        self.assertIsNone(registry.bound_is_allowed())
+        registry.register(MediaAccessPolicy(('images/',), lambda r, p: False))
+        self.assertEqual(registry.bound_is_allowed(), registry._wrapped.is_allowed)
+
+    def test_ready_discovers_policies(self):
+        app_config = apps.get_app_config("django_secure_media")
+        with mock.patch.object(app_config.module, "autodiscover") as autodiscover:
+            app_config.ready()
+        autodiscover.assert_called_once_with()
+
+    @override_settings(SECURE_MEDIA_LAZY_DISCOVER=True)
+    def test_ready_skips_discovery_when_lazy(self):
+        app_config = apps.get_app_config("django_secure_media")
+        with mock.patch.object(app_config.module, "autodiscover") as autodiscover:
+            app_config.ready()
+        autodiscover.assert_not_called()